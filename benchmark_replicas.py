@@ -0,0 +1,41 @@
+"""Compare replica training throughput of the vmap and loop methods.
+
+    python benchmark_replicas.py --replicas 1 4 8 --batch-sizes 32 128
+
+Prints images/sec over all replicas for each method; 'loop' at K replicas is
+what K separate runs would reach, minus the K-1 extra data loads they pay.
+"""
+import argparse
+
+import torch
+
+from face_generator.replicas import REPLICA_METHODS, build_replicas, time_replicas
+from face_generator.training import default_device
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--replicas', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 128])
+    parser.add_argument('--conv-dim', type=int, default=32)
+    parser.add_argument('--z-size', type=int, default=100)
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--device', default=default_device())
+    args = parser.parse_args()
+
+    print('device {} | {} threads'.format(args.device, torch.get_num_threads()))
+    print('{:>8s} {:>6s} {:>14s} {:>14s}'.format('replicas', 'batch', 'vmap img/s', 'loop img/s'))
+    for n_replicas in args.replicas:
+        for batch_size in args.batch_sizes:
+            Ds, Gs = build_replicas(args.conv_dim, args.conv_dim, args.z_size,
+                                    seeds=range(n_replicas))
+            for model in Ds + Gs:
+                model.to(args.device)
+            real_images = torch.rand(batch_size, 3, 32, 32, device=args.device) * 2 - 1
+            rates = [time_replicas(method, Ds, Gs, real_images, args.steps)
+                     for method in REPLICA_METHODS]
+            print('{:8d} {:6d} {:14.0f} {:14.0f}'.format(n_replicas, batch_size, *rates))
+
+
+if __name__ == '__main__':
+    main()
@@ -63,35 +63,12 @@ get_ipython().run_line_magic('matplotlib', 'inline')
 # %%
 # necessary imports
 import torch
-from torchvision import datasets
-from torchvision import transforms
-from torch.utils.data import DataLoader
-import os
+from face_generator.data import get_dataloader
 
 
 # %%
-def get_dataloader(batch_size, image_size, data_dir='processed_celeba_small/celeba/'):
-    """
-    Batch the neural network data using DataLoader
-    :param batch_size: The size of each batch; the number of images in a batch
-    :param img_size: The square size of the image data (x, y)
-    :param data_dir: Directory where image data is located
-    :return: DataLoader with batched data
-    """
-
-    # Transform data into tensors of the correct size
-    transform = transforms.Compose([transforms.Resize(image_size),  # resize to 128x128
-                                    transforms.ToTensor()])
-
-    # get training and test directories
-    image_path = os.path.join(os.getcwd(), data_dir)
-    dataset = datasets.ImageFolder(image_path, transform)
-
-    # create and return DataLoaders
-    loader = DataLoader(
-        dataset=dataset, batch_size=batch_size, shuffle=True)
-
-    return loader
+# `get_dataloader` lives in face_generator/data.py; torchvision is only
+# imported when it is called
 
 # %% [markdown]
 # ## Create a DataLoader
@@ -105,7 +82,8 @@ def get_dataloader(batch_size, image_size, data_dir='processed_celeba_small/cele
 
 # %%
 # Define function hyperparameters
-batch_size = 32
+# None uses the autotuned profile's batch size, or 32 without a profile
+batch_size = None
 img_size = 32
 """
 DON'T MODIFY ANYTHING IN THIS CELL THAT IS BELOW THIS LINE
@@ -120,25 +98,20 @@ celeba_train_loader = get_dataloader(batch_size, img_size)
 
 # %%
 # helper display function
-
-
-def imshow(img):
-    npimg = img.numpy()
-    plt.imshow(np.transpose(npimg, (1, 2, 0)))
-
+from face_generator.plot import imshow
 
 """
 DON'T MODIFY ANYTHING IN THIS CELL THAT IS BELOW THIS LINE
 """
 # obtain one batch of training images
 dataiter = iter(celeba_train_loader)
-images, _ = dataiter.next()  # _ for no labels
+images, _ = next(dataiter)  # _ for no labels
 
 # plot the images in the batch, along with the corresponding labels
 fig = plt.figure(figsize=(20, 4))
 plot_size = 20
 for idx in np.arange(plot_size):
-    ax = fig.add_subplot(2, plot_size / 2, idx + 1, xticks=[], yticks=[])
+    ax = fig.add_subplot(2, plot_size // 2, idx + 1, xticks=[], yticks=[])
     imshow(images[idx])
 
 # %% [markdown]
@@ -147,20 +120,8 @@ for idx in np.arange(plot_size):
 # You need to do a bit of pre-processing; you know that the output of a `tanh` activated generator will contain pixel values in a range from -1 to 1, and so, we need to rescale our training images to a range of -1 to 1. (Right now, they are in a range from 0-1.)
 
 # %%
-# TODO: Complete the scale function
-
-
-def scale(x, feature_range=(-1, 1)):
-    '''
-    Scale takes in an image x and returns that image, scaled
-    with a feature_range of pixel values from -1 to 1.
-    This function assumes that the input x is already scaled from 0-1.
-    '''
-    # assume x is scaled to (0, 1)
-    # scale to feature_range and return scaled x
-    min, max = feature_range
-
-    return x * (max - min) + min
+# `scale` lives in face_generator/data.py
+from face_generator.data import scale
 
 
 # %%
@@ -191,71 +152,13 @@ print('Max: ', scaled_img.max())
 #
 
 # %%
-import torch.nn as nn
-import torch.nn.functional as F
+# the networks live in face_generator/models.py, which only imports torch
+from face_generator.models import conv, deconv
 
 # %%
 
-
-def conv(in_channels, out_channels, kernel_size=4, stride=2, padding=1, batch_norm=True):
-    """Creates a convolutional layer, with optional batch normalization.
-    kernel_size, stride and padding default values are set to reduce
-    the input image size by 2 (when the input size is a power of 2)
-    """
-    layers = []
-    conv_layer = nn.Conv2d(in_channels, out_channels,
-                           kernel_size, stride, padding, bias=False)
-
-    layers.append(conv_layer)
-
-    if batch_norm:
-        layers.append(nn.BatchNorm2d(out_channels))
-
-    return nn.Sequential(*layers)
-
 # %%
-
-
-class Discriminator(nn.Module):
-
-    def __init__(self, conv_dim):
-        """
-        Initialize the Discriminator Module
-        :param conv_dim: The depth of the first convolutional layer
-        """
-        super(Discriminator, self).__init__()
-
-        self.conv_dim = conv_dim
-
-        # 32x32 input
-        # first layer, no batch_norm
-        self.conv1 = conv(3, conv_dim, batch_norm=False)
-        # 16x16 out
-        self.conv2 = conv(conv_dim, conv_dim * 2)
-        # 8x8 out
-        self.conv3 = conv(conv_dim * 2, conv_dim * 4)
-        # 4x4 out
-
-        # final, fully-connected layer
-        self.fc = nn.Linear(conv_dim * 4 * 4 * 4, 1)
-
-    def forward(self, x):
-        """
-        Forward propagation of the neural network
-        :param x: The input to the neural network
-        :return: Discriminator logits; the output of the neural network
-        """
-        out = F.leaky_relu(self.conv1(x), 0.2)
-        out = F.leaky_relu(self.conv2(out), 0.2)
-        out = F.leaky_relu(self.conv3(out), 0.2)
-
-        # flatten
-        out = out.view(-1, self.conv_dim * 4 * 4 * 4)
-
-        # final output layer
-        out = self.fc(out)
-        return out
-
+from face_generator.models import Discriminator
 
 """
 DON'T MODIFY ANYTHING IN THIS CELL THAT IS BELOW THIS LINE
@@ -273,66 +176,8 @@ tests.test_discriminator(Discriminator)
 
 # %%
 
-
-def deconv(in_channels, out_channels, kernel_size=4, stride=2, padding=1, batch_norm=True):
-    """Creates a transposed-convolutional layer, with optional batch normalization.
-    """
-    # create a sequence of transpose + optional batch norm layers
-    layers = []
-    transpose_conv_layer = nn.ConvTranspose2d(in_channels, out_channels,
-                                              kernel_size, stride, padding, bias=False)
-
-    layers.append(transpose_conv_layer)
-
-    if batch_norm:
-        layers.append(nn.BatchNorm2d(out_channels))
-
-    return nn.Sequential(*layers)
-
 # %%
-
-
-class Generator(nn.Module):
-
-    def __init__(self, z_size, conv_dim):
-        """
-        Initialize the Generator Module
-        :param z_size: The length of the input latent vector, z
-        :param conv_dim: The depth of the inputs to the *last* transpose convolutional layer
-        """
-        super(Generator, self).__init__()
-
-        self.conv_dim = conv_dim
-
-        # first, fully-connected layer
-        self.fc = nn.Linear(z_size, conv_dim * 4 * 4 * 4)
-
-        # transpose conv layers
-        self.deconv1 = deconv(conv_dim * 4, conv_dim * 2)
-        self.deconv2 = deconv(conv_dim * 2, conv_dim)
-        self.deconv3 = deconv(conv_dim, 3, batch_norm=False)
-
-    def forward(self, x):
-        """
-        Forward propagation of the neural network
-        :param x: The input to the neural network
-        :return: A 32x32x3 Tensor image as output
-        """
-        # fully-connected
-        out = self.fc(x)
-        # reshape to (batch_size, depth, 4, 4)
-        out = out.view(-1, self.conv_dim * 4, 4, 4)
-
-        # hidden transpose conv layers + relu
-        out = F.relu(self.deconv1(out))
-        out = F.relu(self.deconv2(out))
-
-        # last layer + tanh activation
-        out = self.deconv3(out)
-        out = torch.tanh(out)
-
-        return out
-
+from face_generator.models import Generator
 
 """
 DON'T MODIFY ANYTHING IN THIS CELL THAT IS BELOW THIS LINE
@@ -356,32 +201,7 @@ tests.test_generator(Generator)
 # * The bias terms, if they exist, may be left alone or set to 0.
 
 # %%
-
-
-def weights_init_normal(m):
-    """
-    Applies initial weights to certain layers in a model .
-    The weights are taken from a normal distribution
-    with mean = 0, std dev = 0.02.
-    :param m: A module or layer in a network
-    """
-    # classname will be something like:
-    # `Conv`, `BatchNorm2d`, `Linear`, etc.
-    classname = m.__class__.__name__
-
-    mean = 0
-    std_dev = 0.02
-
-    if hasattr(m, 'weight') and (classname.find('Conv') != -1 or classname.find('Linear') != -1):
-        # init weights with normal distribution
-        m.weight.data.normal_(mean, std_dev)
-
-        if hasattr(m, 'bias') and m.bias is not None:
-            m.bias.data.fill_(0)
-    # BatchNorm Layer's weight is not a matrix; only normal distribution applies.
-    elif classname.find('BatchNorm2d') != -1:
-        m.weight.data.normal_(1.0, std_dev)
-        m.bias.data.fill_(0.0)
+from face_generator.models import weights_init_normal
 
 
 # %% [markdown]
@@ -389,25 +209,8 @@ def weights_init_normal(m):
 #
 # Define your models' hyperparameters and instantiate the discriminator and generator from the classes defined above. Make sure you've passed in the correct input arguments.
 # %%
-"""
-DON'T MODIFY ANYTHING IN THIS CELL THAT IS BELOW THIS LINE
-"""
-
-
-def build_network(d_conv_dim, g_conv_dim, z_size):
-    # define discriminator and generator
-    D = Discriminator(d_conv_dim)
-    G = Generator(z_size=z_size, conv_dim=g_conv_dim)
-
-    # initialize model weights
-    D.apply(weights_init_normal)
-    G.apply(weights_init_normal)
+from face_generator.models import build_network
 
-    print(D)
-    print()
-    print(G)
-
-    return D, G
 
 # %% [markdown]
 # #### Exercise: Define model hyperparameters
@@ -424,6 +227,10 @@ DON'T MODIFY ANYTHING IN THIS CELL THAT IS BELOW THIS LINE
 """
 D, G = build_network(d_conv_dim, g_conv_dim, z_size)
 
+print(D)
+print()
+print(G)
+
 # %% [markdown]
 # ### Training on GPU
 #
@@ -468,44 +275,11 @@ else:
 # **You may choose to use either cross entropy or a least squares error loss to complete the following `real_loss` and `fake_loss` functions.**
 
 # %%
+# `real_loss` and `fake_loss` live in face_generator/training.py and put
+# their labels on the same device as the logits
+from face_generator.training import real_loss, fake_loss
 
 
-def real_loss(D_out):
-    '''Calculates how close discriminator outputs are to being real.
-       param, D_out: discriminator logits
-       return: real loss
-    '''
-    batch_size = D_out.size(0)
-
-    labels = torch.ones(batch_size)  # real labels = 1
-    # move labels to GPU if available
-    if train_on_gpu:
-        labels = labels.cuda()
-    # binary cross entropy with logits loss
-    criterion = nn.BCEWithLogitsLoss()
-    # calculate loss
-    loss = criterion(D_out.squeeze(), labels)
-    return loss
-
-
-def fake_loss(D_out):
-    '''Calculates how close discriminator outputs are to being fake.
-       param, D_out: discriminator logits
-       return: fake loss
-    '''
-    batch_size = D_out.size(0)
-
-    labels = torch.zeros(batch_size)  # fake labels = 0
-
-    # move labels to GPU if available
-    if train_on_gpu:
-        labels = labels.cuda()
-    # binary cross entropy with logits loss
-    criterion = nn.BCEWithLogitsLoss()
-    # calculate loss
-    loss = criterion(D_out.squeeze(), labels)
-    return loss
-
 # %% [markdown]
 # ## Optimizers
 #
@@ -515,7 +289,7 @@ def fake_loss(D_out):
 
 
 # %%
-import torch.optim as optim
+from face_generator.training import build_optimizers
 
 # Create optimizers for the discriminator D and generator G
 # params
@@ -524,8 +298,7 @@ beta1 = 0.5
 beta2 = 0.999  # default value
 
 # Create optimizers for the discriminator and generator
-d_optimizer = optim.Adam(D.parameters(), lr, [beta1, beta2])
-g_optimizer = optim.Adam(G.parameters(), lr, [beta1, beta2])
+d_optimizer, g_optimizer = build_optimizers(D, G, lr, beta1, beta2)
 
 # %% [markdown]
 # ---
@@ -547,121 +320,17 @@ g_optimizer = optim.Adam(G.parameters(), lr, [beta1, beta2])
 
 # %%
 import helper
+from face_generator.training import train
+
 
+# %% [markdown]
+# ## Training replicas in one batched step
+#
+# With `conv_dim=32` a single run is too small to keep the hardware busy. `train_replicas` takes K independent Discriminator/Generator pairs, each initialized from its own seed, stacks their weights with `torch.func.stack_module_state` and runs all of them through `vmap`. One fused step then trains every replica on the same real batch, and each replica ends up with its own losses and checkpoints.
+
+# %%
+from face_generator.replicas import build_replicas, train_replicas
 
-def train(D, G, n_epochs, print_every=50):
-    '''Trains adversarial networks for some number of epochs
-       param, D: the discriminator network
-       param, G: the generator network
-       param, n_epochs: number of epochs to train for
-       param, print_every: when to print and record the models' losses
-       return: D and G losses
-    '''
-
-    # move models to GPU
-    if train_on_gpu:
-        D.cuda()
-        G.cuda()
-
-    # keep track of loss and generated, "fake" samples
-    samples = []
-    losses = []
-
-    # Get some fixed data for sampling. These are images that are held
-    # constant throughout training, and allow us to inspect the model's performance
-    sample_size = 16
-    fixed_z = np.random.uniform(-1, 1, size=(sample_size, z_size))
-    fixed_z = torch.from_numpy(fixed_z).float()
-    # move z to GPU if available
-    if train_on_gpu:
-        fixed_z = fixed_z.cuda()
-
-    # epoch training loop
-    for epoch in range(n_epochs):
-
-        # batch training loop
-        for batch_i, (real_images, _) in enumerate(celeba_train_loader):
-
-            batch_size = real_images.size(0)
-            real_images = scale(real_images)
-
-            if train_on_gpu:
-                real_images = real_images.cuda()
-            # ===============================================
-            #         YOUR CODE HERE: TRAIN THE NETWORKS
-            # ===============================================
-
-            # 1. Train the discriminator on real and fake images
-            d_optimizer.zero_grad()
-
-            d_real = D(real_images)
-            d_real_loss = real_loss(d_real)
-
-            # Generate fake images
-            z = np.random.uniform(-1, 1, size=(batch_size, z_size))
-            z = torch.from_numpy(z).float()
-
-            if train_on_gpu:
-                z = z.cuda()
-
-            fake_images = G(z)
-
-            # Compute the discriminator losses on fake images
-            d_fake = D(fake_images)
-            d_fake_loss = fake_loss(d_fake)
-
-            d_loss = d_real_loss + d_fake_loss
-            d_loss.backward()
-            d_optimizer.step()
-
-            # 2. Train the generator with an adversarial loss
-            g_optimizer.zero_grad()
-
-            # Generate fake images
-            z = np.random.uniform(-1, 1, size=(batch_size, z_size))
-            z = torch.from_numpy(z).float()
-
-            if train_on_gpu:
-                z = z.cuda()
-
-            fake_images = G(z)
-
-            # Compute the discriminator losses on fake images
-            d_fake = D(fake_images)
-
-            g_loss = real_loss(d_fake)
-            g_loss.backward()
-            g_optimizer.step()
-
-            # ===============================================
-            #              END OF YOUR CODE
-            # ===============================================
-
-            # Print some loss stats
-            if batch_i % print_every == 0:
-                # append discriminator loss and generator loss
-                losses.append((d_loss.item(), g_loss.item()))
-                # print discriminator and generator loss
-                print('Epoch [{:5d}/{:5d}] | d_loss: {:6.4f} | g_loss: {:6.4f}'.format(
-                    epoch + 1, n_epochs, d_loss.item(), g_loss.item()))
-                # save models
-                helper.save_model('./discriminator', D)
-                helper.save_model('./generator', G)
-
-        ## AFTER EACH EPOCH##
-        # this code assumes your generator is named G, feel free to change the name
-        # generate and save sample, fake images
-        G.eval()  # for generating samples
-        samples_z = G(fixed_z)
-        samples.append(samples_z)
-        G.train()  # back to training mode
-
-    # Save training generator samples
-    with open('train_samples.pkl', 'wb') as f:
-        pkl.dump(samples, f)
-
-    # finally return losses
-    return losses
 
 # %% [markdown]
 # Set your number of training epochs and train your GAN!
@@ -676,12 +345,16 @@ n_epochs = 200
 # D = helper.load_model('./discriminator')
 # G = helper.load_model('./generator')
 
+# or train several replicas, one per seed, in a single batched run
+# Ds, Gs = build_replicas(d_conv_dim, g_conv_dim, z_size, seeds=range(4))
+# replica_losses = train_replicas(Ds, Gs, celeba_train_loader, n_epochs=n_epochs)
+
 
 """
 DON'T MODIFY ANYTHING IN THIS CELL
 """
 # call training function
-losses = train(D, G, n_epochs=n_epochs)
+losses = train(D, G, celeba_train_loader, d_optimizer, g_optimizer, n_epochs=n_epochs)
 
 # %% [markdown]
 # ## Training loss
@@ -689,12 +362,9 @@ losses = train(D, G, n_epochs=n_epochs)
 # Plot the training losses for the generator and discriminator, recorded after each epoch.
 
 # %%
-fig, ax = plt.subplots()
-losses = np.array(losses)
-plt.plot(losses.T[0], label='Discriminator', alpha=0.5)
-plt.plot(losses.T[1], label='Generator', alpha=0.5)
-plt.title("Training Losses")
-plt.legend()
+from face_generator.plot import plot_losses
+
+_ = plot_losses(losses)
 
 # %% [markdown]
 # ## Generator samples from training
@@ -703,18 +373,7 @@ plt.legend()
 
 # %%
 # helper function for viewing a list of passed in sample images
-
-
-def view_samples(epoch, samples):
-    fig, axes = plt.subplots(figsize=(16, 4), nrows=2,
-                             ncols=8, sharey=True, sharex=True)
-    for ax, img in zip(axes.flatten(), samples[epoch]):
-        img = img.detach().cpu().numpy()
-        img = np.transpose(img, (1, 2, 0))
-        img = ((img + 1) * 255 / (2)).astype(np.uint8)
-        ax.xaxis.set_visible(False)
-        ax.yaxis.set_visible(False)
-        im = ax.imshow(img.reshape((32, 32, 3)))
+from face_generator.plot import view_samples
 
 
 # %%
@@ -0,0 +1,44 @@
+"""DCGAN face generator.
+
+Names are resolved from their submodule on first access, so importing the
+package is free and ``from face_generator import Generator`` only loads torch.
+"""
+import importlib
+
+_exports = {
+    'Discriminator': 'models',
+    'Generator': 'models',
+    'build_network': 'models',
+    'weights_init_normal': 'models',
+    'get_dataloader': 'data',
+    'scale': 'data',
+    'real_loss': 'training',
+    'fake_loss': 'training',
+    'build_optimizers': 'training',
+    'train': 'training',
+    'build_replicas': 'replicas',
+    'train_replicas': 'replicas',
+    'StackedReplicas': 'replicas',
+    'LoopedReplicas': 'replicas',
+    'rejection_sample': 'sampling',
+    'RejectionStats': 'sampling',
+    'FaceGenerator': 'generation',
+    'seed_latents': 'generation',
+    'render_walk': 'walk',
+    'save_model': 'helper',
+    'load_model': 'helper',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + _exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
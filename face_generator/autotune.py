@@ -0,0 +1,227 @@
+"""Throughput autotuner for training and generation.
+
+Runs short timed trials of the real D/G training step and of the
+generate-and-score pass, searching thread counts, batch size and loader
+workers within a memory budget, and writes the winners to the profile that
+``get_dataloader``, ``train`` and ``rejection_sample`` read (see config.py).
+
+The budget covers the memory the steps add on top of the built networks:
+activations, gradients, optimizer state and allocator overhead. The
+interpreter, libtorch and the weights themselves are left out, so the number
+means the same on CPU, where it is the growth of the process's resident set,
+and on CUDA, where it is the growth of allocated tensor memory.
+
+Every step trial runs in a freshly spawned process, because torch only lets
+the inter-op thread count be set once per process.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from . import config
+
+TRAIN_BATCH_SIZES = (32, 64, 128, 256, 512)
+GENERATE_BATCH_SIZES = (64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _default_thread_counts():
+    n_cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < n_cpus:
+        counts.append(counts[-1] * 2)
+    if n_cpus > 1:
+        counts.append(n_cpus)
+    return counts
+
+
+def _current_memory(device):
+    import torch
+
+    if device == 'cuda':
+        torch.cuda.reset_peak_memory_stats()
+        return torch.cuda.memory_allocated()
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # without /proc the peak so far is the closest baseline
+        return _peak_memory(device)
+
+
+def _peak_memory(device):
+    import torch
+
+    if device == 'cuda':
+        return torch.cuda.max_memory_allocated()
+    import resource
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _run_trial(kind, settings, model_args, device, n_steps, warmup=3):
+    """Times n_steps of one workload in the current process, return images/sec and step memory"""
+    import torch
+
+    from .models import build_network
+    from .sampling import sample_latents
+    from .training import build_optimizers, train_step
+
+    config.apply_threads(settings)
+    batch_size = settings['batch_size']
+
+    D, G = build_network(*model_args)
+    D.to(device)
+    G.to(device)
+
+    if kind == 'train':
+        d_optimizer, g_optimizer = build_optimizers(D, G)
+        real_images = torch.rand(batch_size, 3, 32, 32, device=device) * 2 - 1
+
+        def step():
+            train_step(D, G, real_images, d_optimizer, g_optimizer)
+    else:
+        D.eval()
+        G.eval()
+        z_size = G.fc.in_features
+
+        def step():
+            with torch.inference_mode():
+                D(G(sample_latents(batch_size, z_size, device)))
+
+    # the warmup steps allocate the activations and optimizer state, so the
+    # baseline is taken before them
+    baseline = _current_memory(device)
+    for _ in range(warmup):
+        step()
+    if device == 'cuda':
+        torch.cuda.synchronize()
+
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        step()
+    if device == 'cuda':
+        torch.cuda.synchronize()
+    seconds = time.perf_counter() - start
+
+    return {'images_per_sec': n_steps * batch_size / seconds,
+            'step_memory': _peak_memory(device) - baseline}
+
+
+def _trial(kind, settings, model_args, device, n_steps):
+    """Runs one trial in a spawned process, None when it runs out of memory or crashes"""
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+        try:
+            return pool.submit(_run_trial, kind, settings, model_args, device, n_steps).result()
+        except (RuntimeError, MemoryError, BrokenProcessPool):
+            return None
+
+
+def _loader_throughput(data_dir, image_size, batch_size, num_workers, n_batches):
+    from .data import get_dataloader
+
+    loader = get_dataloader(batch_size, image_size, data_dir, num_workers=num_workers)
+    batches = iter(loader)
+    # the first batch pays for starting the workers, which happens once per run
+    next(batches)
+
+    n_images = 0
+    start = time.perf_counter()
+    for _, (images, _) in zip(range(n_batches), batches):
+        n_images += images.size(0)
+    return n_images / (time.perf_counter() - start)
+
+
+def tune_steps(kind, batch_sizes, model_args, device, memory_budget=None,
+               thread_counts=None, interop_thread_counts=(1, 2, 4), n_steps=20, log=print):
+    """
+    Search thread counts, then batch size, for one workload
+    :param kind: 'train' for the D/G training step, 'generate' for the generate-and-score pass
+    :param batch_sizes: Batch sizes to try, in increasing order
+    :param model_args: d_conv_dim, g_conv_dim and z_size of the networks
+    :param memory_budget: Memory the steps may add on top of the networks, in bytes
+    :return: Best settings and their images/sec
+    """
+    thread_counts = thread_counts or _default_thread_counts()
+
+    def run(settings):
+        result = _trial(kind, settings, model_args, device, n_steps)
+        fits = result is not None and (memory_budget is None
+                                       or result['step_memory'] <= memory_budget)
+        if result is None:
+            log('{:8s} {} | failed'.format(kind, settings))
+        else:
+            log('{:8s} {} | {:8.0f} images/sec | {:6.0f} MB{}'.format(
+                kind, settings, result['images_per_sec'], result['step_memory'] / 2 ** 20,
+                '' if fits else ' (over budget)'))
+        return result['images_per_sec'] if fits else None
+
+    # thread counts barely interact with the batch size, so tune them first
+    # on the smallest batch and then grow the batch with the winners
+    best, best_rate = None, 0.0
+    for num_threads in thread_counts:
+        for num_interop_threads in interop_thread_counts:
+            if num_interop_threads > num_threads:
+                continue
+            settings = {'batch_size': batch_sizes[0], 'num_threads': num_threads,
+                        'num_interop_threads': num_interop_threads}
+            rate = run(settings)
+            if rate is not None and rate > best_rate:
+                best, best_rate = settings, rate
+
+    if best is None:
+        raise RuntimeError('No {} trial fits the memory budget'.format(kind))
+
+    for batch_size in batch_sizes[1:]:
+        settings = dict(best, batch_size=batch_size)
+        rate = run(settings)
+        if rate is None:
+            # larger batches only need more memory
+            break
+        if rate > best_rate:
+            best, best_rate = settings, rate
+
+    return best, best_rate
+
+
+def tune_workers(data_dir, image_size, batch_size, worker_counts=None, n_batches=50, log=print):
+    """Pick the loader worker count that feeds batches the fastest"""
+    worker_counts = worker_counts or [0] + _default_thread_counts()
+    best, best_rate = 0, 0.0
+    for num_workers in worker_counts:
+        rate = _loader_throughput(data_dir, image_size, batch_size, num_workers, n_batches)
+        log('loader   {{\'num_workers\': {}}} | {:8.0f} images/sec'.format(num_workers, rate))
+        if rate > best_rate:
+            best, best_rate = num_workers, rate
+    return best
+
+
+def autotune(d_conv_dim=32, g_conv_dim=32, z_size=100, data_dir=None, image_size=32,
+             memory_budget=None, train_batch_sizes=TRAIN_BATCH_SIZES,
+             generate_batch_sizes=GENERATE_BATCH_SIZES, thread_counts=None,
+             worker_counts=None, n_steps=20, device=None, path=None, log=print):
+    """
+    Tune training and generation throughput and write the profile
+    :param data_dir: Image folder used to tune the loader workers, skipped when None
+    :param memory_budget: Memory the steps may add on top of the networks, in bytes
+    :param path: Profile file, defaults to $FACE_GENERATOR_PROFILE or ./face_generator_profile.json
+    :return: The profile that was written
+    """
+    from .training import default_device
+
+    device = device or default_device()
+    model_args = (d_conv_dim, g_conv_dim, z_size)
+
+    train_settings, _ = tune_steps('train', train_batch_sizes, model_args, device,
+                                   memory_budget, thread_counts, n_steps=n_steps, log=log)
+    generate_settings, _ = tune_steps('generate', generate_batch_sizes, model_args, device,
+                                      memory_budget, thread_counts, n_steps=n_steps, log=log)
+
+    if data_dir is not None:
+        train_settings['num_workers'] = tune_workers(
+            data_dir, image_size, train_settings['batch_size'], worker_counts, log=log)
+
+    profile = {'train': train_settings, 'generate': generate_settings}
+    log('wrote {}'.format(config.save_profile(profile, path)))
+    return profile
@@ -0,0 +1,178 @@
+"""Command line entry point: ``python -m face_generator <command>``."""
+import argparse
+
+CHECKPOINT_HELP = "checkpoint path, '.pt' is appended when it has no extension"
+
+
+def _train(args):
+    from .data import get_dataloader
+    from .models import build_network
+    from .training import build_optimizers, train
+
+    loader = get_dataloader(args.batch_size, args.img_size, args.data_dir,
+                            num_workers=args.num_workers)
+
+    if args.replicas > 1:
+        from .replicas import build_replicas, train_replicas
+
+        Ds, Gs = build_replicas(args.d_conv_dim, args.g_conv_dim, args.z_size,
+                                seeds=range(args.seed, args.seed + args.replicas))
+        train_replicas(Ds, Gs, loader, args.epochs, lr=args.lr,
+                       beta1=args.beta1, beta2=args.beta2, print_every=args.print_every,
+                       method=args.replica_method)
+        return
+
+    D, G = build_network(args.d_conv_dim, args.g_conv_dim, args.z_size)
+    d_optimizer, g_optimizer = build_optimizers(D, G, args.lr, args.beta1, args.beta2)
+    train(D, G, loader, d_optimizer, g_optimizer, args.epochs, print_every=args.print_every)
+
+
+def _sample(args):
+    import torch
+
+    from .helper import load_model
+    from .sampling import RejectionStats, rejection_sample
+
+    G = load_model(args.generator)
+    D = load_model(args.discriminator)
+
+    stats = RejectionStats()
+    batches = [images.cpu() for images in rejection_sample(
+        G, D, args.n_images, keep=args.keep, threshold=args.threshold,
+        batch_size=args.batch_size, stats=stats, max_batches=args.max_batches)]
+    torch.save(torch.cat(batches), args.out)
+    print(stats)
+
+
+def _generate(args):
+    import os
+
+    from .generation import FaceGenerator
+    from .helper import load_model
+
+    faces = FaceGenerator(load_model(args.generator), cache_size=0)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for seed, png in zip(args.seeds, faces.get_many(args.seeds)):
+        with open(os.path.join(args.out_dir, 'seed_{}.png'.format(seed)), 'wb') as f:
+            f.write(png)
+
+
+def _walk(args):
+    from .helper import load_model
+    from .walk import render_walk, walk_length, write_frames, write_grid
+
+    frames = render_walk(load_model(args.generator), args.seeds, args.frames,
+                         batch_size=args.batch_size, method=args.method)
+    if args.grid:
+        write_grid(frames, args.grid, walk_length(len(args.seeds), args.frames), args.columns)
+    else:
+        print('wrote {} frames'.format(write_frames(frames, args.out_dir)))
+
+
+def _autotune(args):
+    from .autotune import autotune
+
+    budget = args.memory_budget_mb * 2 ** 20 if args.memory_budget_mb else None
+    autotune(args.d_conv_dim, args.g_conv_dim, args.z_size, data_dir=args.data_dir,
+             image_size=args.img_size, memory_budget=budget, n_steps=args.steps,
+             path=args.profile)
+
+
+def _ingest(args):
+    from .ingest import ingest
+
+    ingest(args.raw_dir, args.out_dir, args.img_size, workers=args.workers)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='face_generator', description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help='train the DCGAN on a folder of faces')
+    train.add_argument('--data-dir', default='processed_celeba_small/celeba/')
+    train.add_argument('--batch-size', type=int, default=None,
+                       help='defaults to the tuned profile, or 32')
+    train.add_argument('--num-workers', type=int, default=None,
+                       help='loader processes, defaults to the tuned profile, or 0')
+    train.add_argument('--img-size', type=int, default=32)
+    train.add_argument('--d-conv-dim', type=int, default=32)
+    train.add_argument('--g-conv-dim', type=int, default=32)
+    train.add_argument('--z-size', type=int, default=100)
+    train.add_argument('--lr', type=float, default=0.0002)
+    train.add_argument('--beta1', type=float, default=0.5)
+    train.add_argument('--beta2', type=float, default=0.999)
+    train.add_argument('--epochs', type=int, default=200)
+    train.add_argument('--print-every', type=int, default=50)
+    train.add_argument('--replicas', type=int, default=1,
+                       help='train this many seeded replicas side by side')
+    train.add_argument('--replica-method', choices=['auto', 'vmap', 'loop'], default='auto',
+                       help='vmap stacks the replicas into one batched step, loop steps them '
+                            'one after the other, auto times both and keeps the faster')
+    train.add_argument('--seed', type=int, default=0,
+                       help='seed of the first replica, the others follow it')
+    train.set_defaults(func=_train)
+
+    sample = commands.add_parser(
+        'sample', help='generate faces, keeping those the discriminator scores as most real')
+    sample.add_argument('--generator', default='./generator', help=CHECKPOINT_HELP)
+    sample.add_argument('--discriminator', default='./discriminator', help=CHECKPOINT_HELP)
+    sample.add_argument('--n-images', type=int, default=1000)
+    sample.add_argument('--keep', type=float, default=0.25,
+                        help='fraction of each generated batch to keep')
+    sample.add_argument('--threshold', type=float, default=None,
+                        help='keep images whose logit exceeds this instead of a fixed fraction')
+    sample.add_argument('--batch-size', type=int, default=None,
+                        help='defaults to the tuned profile, or 512')
+    sample.add_argument('--max-batches', type=int, default=1000,
+                        help='give up after generating this many batches')
+    sample.add_argument('--out', default='samples.pt')
+    sample.set_defaults(func=_sample)
+
+    generate = commands.add_parser('generate', help='write the faces of the given seeds as PNGs')
+    generate.add_argument('seeds', type=int, nargs='+')
+    generate.add_argument('--generator', default='./generator', help=CHECKPOINT_HELP)
+    generate.add_argument('--out-dir', default='faces')
+    generate.set_defaults(func=_generate)
+
+    walk = commands.add_parser('walk', help='render a latent-space walk through the faces of seeds')
+    walk.add_argument('seeds', type=int, nargs='+', help='keyframe seeds, at least 2')
+    walk.add_argument('--frames', type=int, default=30, help='frames from one keyframe to the next')
+    walk.add_argument('--method', choices=['linear', 'slerp'], default='slerp')
+    walk.add_argument('--generator', default='./generator', help=CHECKPOINT_HELP)
+    walk.add_argument('--batch-size', type=int, default=None,
+                      help='defaults to the tuned profile, or 512')
+    walk.add_argument('--out-dir', default='walk', help='folder of the image sequence')
+    walk.add_argument('--grid', default=None, help='write a single grid image here instead')
+    walk.add_argument('--columns', type=int, default=16)
+    walk.set_defaults(func=_walk)
+
+    autotune = commands.add_parser(
+        'autotune', help='time short trials and write the fastest settings to the profile')
+    autotune.add_argument('--data-dir', default=None,
+                          help='image folder used to tune the loader workers')
+    autotune.add_argument('--img-size', type=int, default=32)
+    autotune.add_argument('--d-conv-dim', type=int, default=32)
+    autotune.add_argument('--g-conv-dim', type=int, default=32)
+    autotune.add_argument('--z-size', type=int, default=100)
+    autotune.add_argument('--memory-budget-mb', type=int, default=None,
+                          help='memory a step may add on top of the loaded networks')
+    autotune.add_argument('--steps', type=int, default=20, help='timed steps per trial')
+    autotune.add_argument('--profile', default=None,
+                          help='defaults to $FACE_GENERATOR_PROFILE or ./face_generator_profile.json')
+    autotune.set_defaults(func=_autotune)
+
+    ingest = commands.add_parser(
+        'ingest', help='resize a folder of raw images for training, skipping unchanged files')
+    ingest.add_argument('raw_dir')
+    ingest.add_argument('out_dir')
+    ingest.add_argument('--img-size', type=int, default=32)
+    ingest.add_argument('--workers', type=int, default=None,
+                        help='processes, defaults to the number of CPUs')
+    ingest.set_defaults(func=_ingest)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
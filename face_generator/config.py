@@ -0,0 +1,52 @@
+"""Throughput profile written by the autotuner and read by training and generation.
+
+The profile is a JSON file with one section per workload, ``train`` and
+``generate``, holding a batch size, thread counts and (for training) the
+number of loader workers. Settings missing from the profile keep their
+defaults, so everything works without one.
+"""
+import json
+import os
+
+PROFILE_ENV = 'FACE_GENERATOR_PROFILE'
+DEFAULT_PROFILE = 'face_generator_profile.json'
+
+
+def profile_path(path=None):
+    return path or os.environ.get(PROFILE_ENV, DEFAULT_PROFILE)
+
+
+def load_profile(section, path=None):
+    """
+    Read one section of the tuned profile
+    :param section: 'train' or 'generate'
+    :param path: Profile file, defaults to $FACE_GENERATOR_PROFILE or ./face_generator_profile.json
+    :return: Dict of settings, empty when there is no profile
+    """
+    path = profile_path(path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get(section, {})
+
+
+def save_profile(profile, path=None):
+    path = profile_path(path)
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2, sort_keys=True)
+    return path
+
+
+def apply_threads(settings):
+    """Apply the torch intra-op and inter-op thread counts of a profile section"""
+    import torch
+
+    if settings.get('num_threads'):
+        torch.set_num_threads(settings['num_threads'])
+    if settings.get('num_interop_threads'):
+        try:
+            torch.set_num_interop_threads(settings['num_interop_threads'])
+        except RuntimeError:
+            # torch only accepts this before its inter-op pool has started,
+            # later calls keep the count already in use
+            pass
@@ -0,0 +1,57 @@
+"""Loading and scaling of the processed CelebA images."""
+import os
+
+from . import config
+
+
+def get_dataloader(batch_size=None, image_size=32, data_dir='processed_celeba_small/celeba/',
+                   num_workers=None):
+    """
+    Batch the neural network data using DataLoader
+    :param batch_size: The size of each batch; the number of images in a batch
+    :param img_size: The square size of the image data (x, y)
+    :param data_dir: Directory where image data is located
+    :param num_workers: Number of loader processes
+    :return: DataLoader with batched data
+
+    batch_size and num_workers default to the tuned 'train' profile, or to 32
+    and 0 without one.
+    """
+    # torchvision is only needed to read the images, not to run the models
+    from torchvision import datasets
+    from torchvision import transforms
+    from torch.utils.data import DataLoader
+
+    # Transform data into tensors of the correct size
+    transform = transforms.Compose([transforms.Resize(image_size),
+                                    transforms.ToTensor()])
+
+    # get training and test directories
+    image_path = os.path.join(os.getcwd(), data_dir)
+    dataset = datasets.ImageFolder(image_path, transform)
+
+    profile = config.load_profile('train')
+    if batch_size is None:
+        batch_size = profile.get('batch_size', 32)
+    if num_workers is None:
+        num_workers = profile.get('num_workers', 0)
+
+    # create and return DataLoaders
+    loader = DataLoader(
+        dataset=dataset, batch_size=batch_size, shuffle=True,
+        num_workers=num_workers, persistent_workers=num_workers > 0)
+
+    return loader
+
+
+def scale(x, feature_range=(-1, 1)):
+    '''
+    Scale takes in an image x and returns that image, scaled
+    with a feature_range of pixel values from -1 to 1.
+    This function assumes that the input x is already scaled from 0-1.
+    '''
+    # assume x is scaled to (0, 1)
+    # scale to feature_range and return scaled x
+    min, max = feature_range
+
+    return x * (max - min) + min
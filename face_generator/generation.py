@@ -0,0 +1,139 @@
+"""Seed-addressable face generation behind an LRU cache.
+
+An integer seed always maps to the same latent vector, drawn from its own
+CPU random generator, so a face can be requested again by its seed from any
+process. Encoded images are kept in a bounded LRU cache, and the misses of a
+request are generated together in batched forward passes.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import torch
+
+from . import config
+from .training import default_device
+
+
+def seed_latents(seeds, z_size):
+    """
+    Map seeds to latent vectors, uniform from -1 to 1 like in training
+    :param seeds: Iterable of integer seeds
+    :param z_size: The length of the latent vectors
+    :return: CPU tensor of shape (len(seeds), z_size)
+    """
+    generator = torch.Generator()
+    latents = []
+    for seed in seeds:
+        generator.manual_seed(seed)
+        latents.append(torch.rand(z_size, generator=generator) * 2 - 1)
+    return torch.stack(latents)
+
+
+def to_uint8(images):
+    """Convert a batch of -1 to 1 images to a (N, H, W, 3) uint8 numpy array"""
+    images = ((images + 1) * 255 / 2).round().clamp(0, 255).to(torch.uint8)
+    return images.permute(0, 2, 3, 1).cpu().numpy()
+
+
+def encode_png(image):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class CacheStats(object):
+    """Counters of a FaceGenerator cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __repr__(self):
+        return 'hits {} | misses {} ({:.1%} hit rate) | evictions {}'.format(
+            self.hits, self.misses, self.hit_rate, self.evictions)
+
+
+class FaceGenerator(object):
+
+    def __init__(self, G, cache_size=1024, batch_size=None, device=None, encode=encode_png):
+        """
+        Serve generated faces by seed
+        :param G: The generator network
+        :param cache_size: Number of encoded images kept, 0 disables the cache
+        :param batch_size: Largest forward pass, defaults to the tuned 'generate' profile or 512
+        :param device: Where to run, defaults to the GPU when there is one
+        :param encode: Turns one (H, W, 3) uint8 image into the cached value, PNG bytes by default
+        """
+        profile = config.load_profile('generate')
+        config.apply_threads(profile)
+
+        self.device = device or default_device()
+        self.G = G.to(self.device).eval()
+        self.z_size = G.fc.in_features
+        self.cache_size = cache_size
+        self.batch_size = batch_size or profile.get('batch_size', 512)
+        self.encode = encode
+        self.stats = CacheStats()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def generate(self, seeds):
+        """Run the generator for seeds, bypassing the cache, as (N, H, W, 3) uint8 images"""
+        chunks = []
+        for i in range(0, len(seeds), self.batch_size):
+            z = seed_latents(seeds[i:i + self.batch_size], self.z_size).to(self.device)
+            with torch.inference_mode():
+                chunks.append(to_uint8(self.G(z)))
+        return [image for chunk in chunks for image in chunk]
+
+    def get_many(self, seeds):
+        """
+        Encoded faces of seeds, from the cache when possible
+        :param seeds: List of integer seeds
+        :return: List of encoded images, in the order of seeds
+        """
+        results = {}
+        with self._lock:
+            for seed in seeds:
+                if seed in results:
+                    continue
+                if seed in self._cache:
+                    self._cache.move_to_end(seed)
+                    results[seed] = self._cache[seed]
+                    self.stats.hits += 1
+
+        # one batched pass for every distinct miss
+        misses = [seed for seed in dict.fromkeys(seeds) if seed not in results]
+        if misses:
+            encoded = [self.encode(image) for image in self.generate(misses)]
+            with self._lock:
+                self.stats.misses += len(misses)
+                for seed, value in zip(misses, encoded):
+                    results[seed] = value
+                    self._put(seed, value)
+
+        return [results[seed] for seed in seeds]
+
+    def get(self, seed):
+        return self.get_many([seed])[0]
+
+    def _put(self, seed, value):
+        if self.cache_size <= 0:
+            return
+        self._cache[seed] = value
+        self._cache.move_to_end(seed)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.stats.evictions += 1
+
+    def __len__(self):
+        return len(self._cache)
@@ -0,0 +1,18 @@
+import os
+import torch
+
+
+def _checkpoint_path(filename):
+    # './generator' -> './generator.pt', explicit extensions are kept
+    return filename if os.path.splitext(filename)[1] else filename + '.pt'
+
+
+def save_model(filename, decoder):
+    torch.save(decoder, _checkpoint_path(filename))
+
+
+def load_model(filename, map_location=None):
+    # checkpoints are whole pickled modules, and may have been saved on a GPU
+    if map_location is None:
+        map_location = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return torch.load(_checkpoint_path(filename), map_location=map_location, weights_only=False)
@@ -0,0 +1,167 @@
+"""Incremental, parallel preparation of a training image folder.
+
+Walks a folder of raw images and writes square ``image_size`` PNG copies to
+``out_dir/faces/``, keeping their relative paths and source extension
+(``a/x.jpg`` becomes ``faces/a/x.jpg.png``), so that two sources never share
+an output and ``ImageFolder`` finds ``faces`` as its single class folder,
+whatever the raw layout. An ``out_dir`` inside the raw folder is skipped.
+
+JPEGs are decoded with PIL's draft mode, which lets libjpeg scale by 1/2, 1/4
+or 1/8 while decoding instead of decoding full size only to shrink to 32px
+afterwards.
+
+``out_dir/manifest.json``, outside the class folder, records each source's
+size, mtime and content hash. Re-runs skip unchanged files by stat, only hash
+files whose stat changed, and only decode files whose content did.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+MANIFEST = 'manifest.json'
+CLASS_DIR = 'faces'
+
+
+def _load_manifest(out_dir, image_size):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    # images of another size have to be redone
+    if manifest.get('image_size') != image_size:
+        return {}
+    return manifest['files']
+
+
+def _save_manifest(out_dir, image_size, files):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'image_size': image_size, 'files': files}, f)
+    os.replace(path + '.tmp', path)
+
+
+def _output_path(out_dir, rel):
+    return os.path.join(out_dir, CLASS_DIR, rel + '.png')
+
+
+def _walk_images(raw_dir, out_dir):
+    out_dir = os.path.realpath(out_dir)
+    for root, dirs, names in os.walk(raw_dir):
+        # never ingest our own outputs
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) != out_dir)
+        for name in sorted(names):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, raw_dir), path
+
+
+def load_image(data, image_size):
+    """
+    Decode image bytes into a square RGB image of image_size
+    :param data: Encoded image
+    :param image_size: Side of the output image
+    :return: PIL image, center cropped and resized
+    """
+    import io
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    # no-op for anything but JPEG, which gets decoded at the smallest scale
+    # that still covers image_size on the shorter side
+    img.draft('RGB', (image_size, image_size))
+    img = img.convert('RGB')
+
+    width, height = img.size
+    side = min(width, height)
+    left = (width - side) // 2
+    top = (height - side) // 2
+    return img.resize((image_size, image_size), Image.BICUBIC,
+                      box=(left, top, left + side, top + side), reducing_gap=3.0)
+
+
+def _ingest_one(src, dst, image_size, known_sha1):
+    """Returns the source's hash and whether it was processed, or None and the error"""
+    try:
+        with open(src, 'rb') as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+
+        if sha1 == known_sha1 and os.path.exists(dst):
+            return sha1, False
+
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        load_image(data, image_size).save(dst)
+        return sha1, True
+    except Exception as e:
+        # one truncated or unreadable image must not stop the whole corpus
+        return None, '{}: {}'.format(type(e).__name__, e)
+
+
+def ingest(raw_dir, out_dir, image_size=32, workers=None, chunksize=64, log=print):
+    """
+    Bring out_dir up to date with the images in raw_dir
+    :param raw_dir: Folder of raw images, walked recursively
+    :param out_dir: Folder receiving one PNG per image in its faces/ class folder
+    :param image_size: Side of the square output images
+    :param workers: Number of processes, defaults to the number of CPUs
+    :return: Number of images processed, skipped, removed and failed
+
+    Images that fail to load are logged and left out of the manifest, so the
+    next run tries them again.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    known = _load_manifest(out_dir, image_size)
+    files = {}
+    pending = []
+    skipped = 0
+
+    for rel, src in _walk_images(raw_dir, out_dir):
+        stat = os.stat(src)
+        entry = known.get(rel)
+        dst = _output_path(out_dir, rel)
+        if (entry is not None and entry['size'] == stat.st_size
+                and entry['mtime'] == stat.st_mtime and os.path.exists(dst)):
+            files[rel] = entry
+            skipped += 1
+        else:
+            pending.append((rel, src, dst, stat, entry['sha1'] if entry else None))
+
+    # outputs of sources that are gone
+    removed = 0
+    for rel in set(known) - set(files) - set(p[0] for p in pending):
+        dst = _output_path(out_dir, rel)
+        if os.path.exists(dst):
+            os.remove(dst)
+        removed += 1
+
+    processed = 0
+    failed = 0
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            results = pool.map(_ingest_one,
+                               [p[1] for p in pending], [p[2] for p in pending],
+                               [image_size] * len(pending), [p[4] for p in pending],
+                               chunksize=chunksize)
+            for (rel, src, dst, stat, _), (sha1, changed) in zip(pending, results):
+                if sha1 is None:
+                    log('failed {}: {}'.format(src, changed))
+                    # don't leave the output of an older version behind
+                    if os.path.exists(dst):
+                        os.remove(dst)
+                    failed += 1
+                    continue
+                files[rel] = {'sha1': sha1, 'size': stat.st_size, 'mtime': stat.st_mtime}
+                if changed:
+                    processed += 1
+                else:
+                    skipped += 1
+    finally:
+        # keep what was done so far even if the run is interrupted
+        _save_manifest(out_dir, image_size, files)
+
+    log('processed {} | skipped {} | removed {} | failed {}'.format(
+        processed, skipped, removed, failed))
+    return processed, skipped, removed, failed
@@ -0,0 +1,162 @@
+"""DCGAN Discriminator and Generator for 32x32x3 face images.
+
+Only torch is imported here so that serving and benchmarking processes can
+load the networks without pulling in torchvision or matplotlib.
+"""
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+def conv(in_channels, out_channels, kernel_size=4, stride=2, padding=1, batch_norm=True):
+    """Creates a convolutional layer, with optional batch normalization.
+    kernel_size, stride and padding default values are set to reduce
+    the input image size by 2 (when the input size is a power of 2)
+    """
+    layers = []
+    conv_layer = nn.Conv2d(in_channels, out_channels,
+                           kernel_size, stride, padding, bias=False)
+
+    layers.append(conv_layer)
+
+    if batch_norm:
+        layers.append(nn.BatchNorm2d(out_channels))
+
+    return nn.Sequential(*layers)
+
+
+def deconv(in_channels, out_channels, kernel_size=4, stride=2, padding=1, batch_norm=True):
+    """Creates a transposed-convolutional layer, with optional batch normalization.
+    """
+    # create a sequence of transpose + optional batch norm layers
+    layers = []
+    transpose_conv_layer = nn.ConvTranspose2d(in_channels, out_channels,
+                                              kernel_size, stride, padding, bias=False)
+
+    layers.append(transpose_conv_layer)
+
+    if batch_norm:
+        layers.append(nn.BatchNorm2d(out_channels))
+
+    return nn.Sequential(*layers)
+
+
+class Discriminator(nn.Module):
+
+    def __init__(self, conv_dim):
+        """
+        Initialize the Discriminator Module
+        :param conv_dim: The depth of the first convolutional layer
+        """
+        super(Discriminator, self).__init__()
+
+        self.conv_dim = conv_dim
+
+        # 32x32 input
+        # first layer, no batch_norm
+        self.conv1 = conv(3, conv_dim, batch_norm=False)
+        # 16x16 out
+        self.conv2 = conv(conv_dim, conv_dim * 2)
+        # 8x8 out
+        self.conv3 = conv(conv_dim * 2, conv_dim * 4)
+        # 4x4 out
+
+        # final, fully-connected layer
+        self.fc = nn.Linear(conv_dim * 4 * 4 * 4, 1)
+
+    def forward(self, x):
+        """
+        Forward propagation of the neural network
+        :param x: The input to the neural network
+        :return: Discriminator logits; the output of the neural network
+        """
+        out = F.leaky_relu(self.conv1(x), 0.2)
+        out = F.leaky_relu(self.conv2(out), 0.2)
+        out = F.leaky_relu(self.conv3(out), 0.2)
+
+        # flatten
+        out = out.view(-1, self.conv_dim * 4 * 4 * 4)
+
+        # final output layer
+        out = self.fc(out)
+        return out
+
+
+class Generator(nn.Module):
+
+    def __init__(self, z_size, conv_dim):
+        """
+        Initialize the Generator Module
+        :param z_size: The length of the input latent vector, z
+        :param conv_dim: The depth of the inputs to the *last* transpose convolutional layer
+        """
+        super(Generator, self).__init__()
+
+        self.conv_dim = conv_dim
+
+        # first, fully-connected layer
+        self.fc = nn.Linear(z_size, conv_dim * 4 * 4 * 4)
+
+        # transpose conv layers
+        self.deconv1 = deconv(conv_dim * 4, conv_dim * 2)
+        self.deconv2 = deconv(conv_dim * 2, conv_dim)
+        self.deconv3 = deconv(conv_dim, 3, batch_norm=False)
+
+    def forward(self, x):
+        """
+        Forward propagation of the neural network
+        :param x: The input to the neural network
+        :return: A 32x32x3 Tensor image as output
+        """
+        # fully-connected
+        out = self.fc(x)
+        # reshape to (batch_size, depth, 4, 4)
+        out = out.view(-1, self.conv_dim * 4, 4, 4)
+
+        # hidden transpose conv layers + relu
+        out = F.relu(self.deconv1(out))
+        out = F.relu(self.deconv2(out))
+
+        # last layer + tanh activation
+        out = self.deconv3(out)
+        out = torch.tanh(out)
+
+        return out
+
+
+def weights_init_normal(m):
+    """
+    Applies initial weights to certain layers in a model .
+    The weights are taken from a normal distribution
+    with mean = 0, std dev = 0.02.
+    :param m: A module or layer in a network
+    """
+    # classname will be something like:
+    # `Conv`, `BatchNorm2d`, `Linear`, etc.
+    classname = m.__class__.__name__
+
+    mean = 0
+    std_dev = 0.02
+
+    if hasattr(m, 'weight') and (classname.find('Conv') != -1 or classname.find('Linear') != -1):
+        # init weights with normal distribution
+        m.weight.data.normal_(mean, std_dev)
+
+        if hasattr(m, 'bias') and m.bias is not None:
+            m.bias.data.fill_(0)
+    # BatchNorm Layer's weight is not a matrix; only normal distribution applies.
+    elif classname.find('BatchNorm2d') != -1:
+        m.weight.data.normal_(1.0, std_dev)
+        m.bias.data.fill_(0.0)
+
+
+def build_network(d_conv_dim, g_conv_dim, z_size):
+    # define discriminator and generator
+    D = Discriminator(d_conv_dim)
+    G = Generator(z_size=z_size, conv_dim=g_conv_dim)
+
+    # initialize model weights
+    D.apply(weights_init_normal)
+    G.apply(weights_init_normal)
+
+    return D, G
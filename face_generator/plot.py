@@ -0,0 +1,36 @@
+"""Plotting helpers for images, samples and losses; matplotlib is imported on first use."""
+import numpy as np
+
+
+def imshow(img):
+    import matplotlib.pyplot as plt
+
+    npimg = img.numpy()
+    plt.imshow(np.transpose(npimg, (1, 2, 0)))
+
+
+def plot_losses(losses):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    losses = np.array(losses)
+    plt.plot(losses.T[0], label='Discriminator', alpha=0.5)
+    plt.plot(losses.T[1], label='Generator', alpha=0.5)
+    plt.title("Training Losses")
+    plt.legend()
+    return fig
+
+
+def view_samples(epoch, samples):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(figsize=(16, 4), nrows=2,
+                             ncols=8, sharey=True, sharex=True)
+    for ax, img in zip(axes.flatten(), samples[epoch]):
+        img = img.detach().cpu().numpy()
+        img = np.transpose(img, (1, 2, 0))
+        img = ((img + 1) * 255 / (2)).astype(np.uint8)
+        ax.xaxis.set_visible(False)
+        ax.yaxis.set_visible(False)
+        im = ax.imshow(img.reshape((32, 32, 3)))
+    return fig
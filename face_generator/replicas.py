@@ -0,0 +1,290 @@
+"""Training K independent GAN replicas side by side.
+
+With ``conv_dim=32`` a single run is too small to keep the hardware busy.
+StackedReplicas stacks the replicas' weights with
+``torch.func.stack_module_state`` and runs them through ``vmap``, so one
+fused D/G step trains every replica on the same real batch. Under ``vmap``
+the convolutions become grouped convolutions, which only pay off when there
+is idle parallel hardware to fill; on a single CPU core they are slower than
+K plain steps. LoopedReplicas runs those K plain steps instead, still sharing
+each loaded batch, and ``train_replicas`` times both and keeps the faster.
+Either way each replica keeps its own losses and checkpoints.
+"""
+import copy
+import pickle as pkl
+import time
+
+import torch
+import torch.nn.functional as F
+import torch.optim as optim
+from torch.func import functional_call, stack_module_state, vmap
+
+from . import config, helper
+from .data import scale
+from .models import Discriminator, Generator, weights_init_normal
+from .training import beta1, beta2, build_optimizers, default_device, lr, train_step
+
+
+def build_replicas(d_conv_dim, g_conv_dim, z_size, seeds):
+    '''Builds one initialized Discriminator/Generator pair per seed
+       param, seeds: random seed of each replica
+       return: list of discriminators and list of generators
+    '''
+    Ds, Gs = [], []
+    for seed in seeds:
+        torch.manual_seed(seed)
+        D = Discriminator(d_conv_dim)
+        G = Generator(z_size=z_size, conv_dim=g_conv_dim)
+        D.apply(weights_init_normal)
+        G.apply(weights_init_normal)
+        Ds.append(D)
+        Gs.append(G)
+
+    return Ds, Gs
+
+
+def stack_replicas(models):
+    '''Stacks models sharing one architecture into batched state
+       param, models: list of K modules
+       return: stateless base module, stacked parameters and stacked buffers
+    '''
+    params, buffers = stack_module_state(models)
+    # the base only carries the architecture, its weights live in params/buffers
+    base = copy.deepcopy(models[0]).to('meta')
+    return base, params, buffers
+
+
+def unstack_replicas(models, params, buffers):
+    '''Copies the k-th slice of the stacked state back into the k-th model'''
+    for k, model in enumerate(models):
+        state = {name: t[k].detach() for name, t in {**params, **buffers}.items()}
+        model.load_state_dict(state)
+
+
+def _replica_call(base):
+    def call(params, buffers, x):
+        return functional_call(base, (params, buffers), (x,))
+    return call
+
+
+def _replica_loss(D_out, target):
+    '''Binary cross entropy of stacked logits, averaged within each replica'''
+    D_out = D_out.squeeze(-1)
+    labels = torch.full_like(D_out, target)
+    loss = F.binary_cross_entropy_with_logits(D_out, labels, reduction='none')
+    return loss.mean(dim=1)
+
+
+class StackedReplicas(object):
+
+    def __init__(self, Ds, Gs, lr=lr, beta1=beta1, beta2=beta2):
+        """
+        Stack K Discriminator/Generator pairs for batched training
+        :param Ds: List of K discriminator networks, already on the training device
+        :param Gs: List of K generator networks, already on the training device
+        """
+        self.Ds = Ds
+        self.Gs = Gs
+        self.d_base, self.d_params, self.d_buffers = stack_replicas(Ds)
+        self.g_base, self.g_params, self.g_buffers = stack_replicas(Gs)
+
+        # every replica sees the same real batch but its own fake batch
+        self.D_real = vmap(_replica_call(self.d_base), in_dims=(0, 0, None))
+        self.D_fake = vmap(_replica_call(self.d_base))
+        self.G_fake = vmap(_replica_call(self.g_base))
+
+        # Adam is element-wise, so one optimizer over the stacked parameters
+        # behaves exactly like K independent optimizers
+        self.d_optimizer = optim.Adam(self.d_params.values(), lr, [beta1, beta2])
+        self.g_optimizer = optim.Adam(self.g_params.values(), lr, [beta1, beta2])
+
+    def step(self, real_images, z=None):
+        """
+        Run one discriminator and one generator update of every replica
+        :param real_images: Batch of real images, already scaled to -1 to 1
+        :param z: Latent batches of shape (K, batch_size, z_size) for the D and G updates,
+                  drawn from -1 to 1 when None
+        :return: Per-replica D and G losses, each of shape (K,)
+        """
+        if z is None:
+            shape = (len(self.Gs), real_images.size(0), self.Gs[0].fc.in_features)
+            z = [torch.rand(shape, device=real_images.device) * 2 - 1 for _ in range(2)]
+        d_z, g_z = z
+
+        # 1. Train the discriminators on real and fake images
+        self.d_optimizer.zero_grad()
+
+        d_real_loss = _replica_loss(self.D_real(self.d_params, self.d_buffers, real_images), 1.0)
+
+        fake_images = self.G_fake(self.g_params, self.g_buffers, d_z)
+        d_fake_loss = _replica_loss(self.D_fake(self.d_params, self.d_buffers, fake_images), 0.0)
+
+        # replicas share no parameters, so the sum gives each one its own gradient
+        d_loss = d_real_loss + d_fake_loss
+        d_loss.sum().backward()
+        self.d_optimizer.step()
+
+        # 2. Train the generators with an adversarial loss
+        self.g_optimizer.zero_grad()
+
+        fake_images = self.G_fake(self.g_params, self.g_buffers, g_z)
+        g_loss = _replica_loss(self.D_fake(self.d_params, self.d_buffers, fake_images), 1.0)
+
+        g_loss.sum().backward()
+        self.g_optimizer.step()
+
+        return d_loss, g_loss
+
+    def sample(self, z):
+        """Generate images of every replica from z of shape (K, n, z_size), in eval mode"""
+        self.g_base.eval()
+        with torch.no_grad():
+            images = self.G_fake(self.g_params, self.g_buffers, z)
+        self.g_base.train()
+        return images
+
+    def unstack(self):
+        """Copy the trained state back into the replicas' modules"""
+        unstack_replicas(self.Ds, self.d_params, self.d_buffers)
+        unstack_replicas(self.Gs, self.g_params, self.g_buffers)
+
+
+class LoopedReplicas(object):
+
+    def __init__(self, Ds, Gs, lr=lr, beta1=beta1, beta2=beta2):
+        """
+        Train K Discriminator/Generator pairs one after the other on each batch,
+        with the same interface as StackedReplicas
+        :param Ds: List of K discriminator networks, already on the training device
+        :param Gs: List of K generator networks, already on the training device
+        """
+        self.Ds = Ds
+        self.Gs = Gs
+        self.optimizers = [build_optimizers(D, G, lr, beta1, beta2) for D, G in zip(Ds, Gs)]
+
+    def step(self, real_images, z=None):
+        losses = []
+        for k, (d_optimizer, g_optimizer) in enumerate(self.optimizers):
+            z_k = None if z is None else (z[0][k], z[1][k])
+            losses.append(train_step(self.Ds[k], self.Gs[k], real_images,
+                                     d_optimizer, g_optimizer, z_k))
+        d_losses, g_losses = zip(*losses)
+        return torch.stack(d_losses), torch.stack(g_losses)
+
+    def sample(self, z):
+        images = []
+        for G, z_k in zip(self.Gs, z):
+            G.eval()
+            with torch.no_grad():
+                images.append(G(z_k))
+            G.train()
+        return torch.stack(images)
+
+    def unstack(self):
+        # the modules are trained in place
+        pass
+
+
+REPLICA_METHODS = {'vmap': StackedReplicas, 'loop': LoopedReplicas}
+
+
+def time_replicas(method, Ds, Gs, real_images, n_steps=3, **adam):
+    """
+    Measure training throughput of a replica method on throwaway copies of the replicas
+    :param method: 'vmap' or 'loop'
+    :param real_images: Batch of real images on the training device, scaled to -1 to 1
+    :return: Images/sec over all replicas
+    """
+    replicas = REPLICA_METHODS[method](copy.deepcopy(Ds), copy.deepcopy(Gs), **adam)
+    cuda = real_images.is_cuda
+
+    # the first step also allocates the optimizer state
+    replicas.step(real_images)
+    if cuda:
+        torch.cuda.synchronize()
+
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        replicas.step(real_images)
+    if cuda:
+        torch.cuda.synchronize()
+    return n_steps * len(Ds) * real_images.size(0) / (time.perf_counter() - start)
+
+
+def train_replicas(Ds, Gs, data_loader, n_epochs, lr=lr, beta1=beta1, beta2=beta2,
+                   print_every=50, device=None, samples_file='train_replicas_samples.pkl',
+                   method='auto'):
+    '''Trains K pairs of adversarial networks side by side in one batched step
+       param, Ds: list of K discriminator networks
+       param, Gs: list of K generator networks
+       param, data_loader: loader of real image batches in the 0-1 range
+       param, n_epochs: number of epochs to train for
+       param, print_every: when to print and record the models' losses
+       param, device: where to train, defaults to the GPU when there is one
+       param, samples_file: pickle file receiving the per-epoch samples
+       param, method: 'vmap', 'loop', or 'auto' to time both on the first batch and keep the faster
+       return: per-replica D and G losses, one (K, 2) array per record
+    '''
+    device = device or default_device()
+    n_replicas = len(Ds)
+    z_size = Gs[0].fc.in_features
+    config.apply_threads(config.load_profile('train'))
+    for model in Ds + Gs:
+        model.to(device)
+
+    if method == 'auto':
+        real_images = scale(next(iter(data_loader))[0]).to(device)
+        rates = {name: time_replicas(name, Ds, Gs, real_images, lr=lr, beta1=beta1, beta2=beta2)
+                 for name in REPLICA_METHODS}
+        method = max(rates, key=rates.get)
+        print('Replica step | {} | using {}'.format(
+            ' | '.join('{}: {:.0f} images/sec'.format(name, rate) for name, rate in rates.items()),
+            method))
+
+    replicas = REPLICA_METHODS[method](Ds, Gs, lr, beta1, beta2)
+
+    samples = []
+    losses = []
+
+    sample_size = 16
+    fixed_z = torch.rand(n_replicas, sample_size, z_size, device=device) * 2 - 1
+
+    for epoch in range(n_epochs):
+        start = time.time()
+        n_images = 0
+
+        for batch_i, (real_images, _) in enumerate(data_loader):
+
+            real_images = scale(real_images).to(device)
+
+            d_loss, g_loss = replicas.step(real_images)
+
+            n_images += n_replicas * real_images.size(0)
+
+            # Print some loss stats
+            if batch_i % print_every == 0:
+                batch_losses = torch.stack([d_loss, g_loss], dim=1).detach().cpu().numpy()
+                losses.append(batch_losses)
+                print('Epoch [{:5d}/{:5d}] | d_loss: {} | g_loss: {} | {:.0f} images/sec'.format(
+                    epoch + 1, n_epochs,
+                    ' '.join('{:6.4f}'.format(loss) for loss in batch_losses[:, 0]),
+                    ' '.join('{:6.4f}'.format(loss) for loss in batch_losses[:, 1]),
+                    n_images / (time.time() - start)))
+                # save models
+                replicas.unstack()
+                for k in range(n_replicas):
+                    helper.save_model('./discriminator_{}'.format(k), Ds[k])
+                    helper.save_model('./generator_{}'.format(k), Gs[k])
+
+        ## AFTER EACH EPOCH##
+        # generate and save sample, fake images of every replica
+        samples.append(replicas.sample(fixed_z))
+
+    replicas.unstack()
+
+    # Save training generator samples, indexed as [epoch][replica]
+    with open(samples_file, 'wb') as f:
+        pkl.dump(samples, f)
+
+    # finally return losses
+    return losses
@@ -0,0 +1,115 @@
+"""Discriminator-guided rejection sampling.
+
+The Generator samples an oversized batch, the Discriminator scores it in the
+same pass and only the best scoring images are kept, trading extra compute
+for sample quality.
+"""
+import time
+
+import torch
+
+from . import config
+from .training import default_device
+
+
+class RejectionStats(object):
+    """Running counters of a rejection sampling stream."""
+
+    def __init__(self):
+        self.generated = 0
+        self.accepted = 0
+        self.seconds = 0.0
+
+    @property
+    def acceptance_rate(self):
+        return self.accepted / self.generated if self.generated else 0.0
+
+    @property
+    def images_per_sec(self):
+        """Accepted, not generated, images per second."""
+        return self.accepted / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return 'accepted {} / {} generated ({:.1%}) | {:.0f} accepted images/sec'.format(
+            self.accepted, self.generated, self.acceptance_rate, self.images_per_sec)
+
+
+def sample_latents(n, z_size, device=None):
+    """Draws n latent vectors uniformly from -1 to 1, like training does"""
+    return torch.rand(n, z_size, device=device) * 2 - 1
+
+
+def rejection_sample(G, D, n_images, keep=0.25, threshold=None, batch_size=None,
+                     device=None, stats=None, max_batches=1000):
+    """
+    Stream generator samples that the discriminator scores as most real
+    :param G: The generator network
+    :param D: The discriminator network
+    :param n_images: Number of accepted images to produce
+    :param keep: Fraction of every generated batch to keep, by top-k on D's logits
+    :param threshold: Keep every image whose logit exceeds this instead of a fixed fraction
+    :param batch_size: Number of images generated and scored per pass, defaults to
+                       the tuned 'generate' profile or 512
+    :param device: Where to run, defaults to the GPU when there is one
+    :param stats: RejectionStats updated as batches are accepted
+    :param max_batches: Batches generated before giving up, None for no limit
+    :return: Iterator over batches of accepted images, in the -1 to 1 range
+    """
+    if not 0 < keep <= 1:
+        raise ValueError('keep must be in (0, 1], got {}'.format(keep))
+
+    device = device or default_device()
+    profile = config.load_profile('generate')
+    config.apply_threads(profile)
+    batch_size = batch_size or profile.get('batch_size', 512)
+    stats = stats if stats is not None else RejectionStats()
+    n_keep = max(1, int(round(keep * batch_size)))
+
+    return _rejection_stream(G, D, n_images, n_keep, threshold, batch_size, device, stats,
+                             max_batches)
+
+
+def _rejection_stream(G, D, n_images, n_keep, threshold, batch_size, device, stats,
+                      max_batches):
+    z_size = G.fc.in_features
+    n_batches = 0
+
+    G.to(device)
+    D.to(device)
+    g_training, d_training = G.training, D.training
+    G.eval()
+    D.eval()
+
+    try:
+        while stats.accepted < n_images:
+            if max_batches is not None and n_batches >= max_batches:
+                raise RuntimeError(
+                    'Gave up after {} batches with {} of {} images accepted, '
+                    'lower the threshold or raise max_batches'.format(
+                        n_batches, stats.accepted, n_images))
+            n_batches += 1
+            start = time.perf_counter()
+
+            with torch.inference_mode():
+                images = G(sample_latents(batch_size, z_size, device))
+                logits = D(images).squeeze(1)
+
+                if threshold is None:
+                    accepted = images[logits.topk(n_keep).indices]
+                else:
+                    accepted = images[logits > threshold]
+
+            accepted = accepted[:n_images - stats.accepted]
+            if accepted.is_cuda:
+                # count the queued kernels in this batch's time
+                torch.cuda.synchronize(accepted.device)
+
+            stats.generated += batch_size
+            stats.accepted += accepted.size(0)
+            stats.seconds += time.perf_counter() - start
+
+            if accepted.size(0):
+                yield accepted
+    finally:
+        G.train(g_training)
+        D.train(d_training)
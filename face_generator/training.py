@@ -0,0 +1,171 @@
+"""Losses, optimizers and the adversarial training loop."""
+import pickle as pkl
+
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from . import config, helper
+from .data import scale
+
+# Adam hyperparameters from the DCGAN paper
+lr = 0.0002
+beta1 = 0.5
+beta2 = 0.999  # default value
+
+
+def default_device():
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def real_loss(D_out):
+    '''Calculates how close discriminator outputs are to being real.
+       param, D_out: discriminator logits
+       return: real loss
+    '''
+    batch_size = D_out.size(0)
+
+    labels = torch.ones(batch_size, device=D_out.device)  # real labels = 1
+    # binary cross entropy with logits loss
+    criterion = nn.BCEWithLogitsLoss()
+    # calculate loss
+    loss = criterion(D_out.squeeze(), labels)
+    return loss
+
+
+def fake_loss(D_out):
+    '''Calculates how close discriminator outputs are to being fake.
+       param, D_out: discriminator logits
+       return: fake loss
+    '''
+    batch_size = D_out.size(0)
+
+    labels = torch.zeros(batch_size, device=D_out.device)  # fake labels = 0
+    # binary cross entropy with logits loss
+    criterion = nn.BCEWithLogitsLoss()
+    # calculate loss
+    loss = criterion(D_out.squeeze(), labels)
+    return loss
+
+
+def build_optimizers(D, G, lr=lr, beta1=beta1, beta2=beta2):
+    '''Creates the Adam optimizers for the discriminator and generator
+       return: d_optimizer, g_optimizer
+    '''
+    d_optimizer = optim.Adam(D.parameters(), lr, [beta1, beta2])
+    g_optimizer = optim.Adam(G.parameters(), lr, [beta1, beta2])
+    return d_optimizer, g_optimizer
+
+
+def train_step(D, G, real_images, d_optimizer, g_optimizer, z=None):
+    '''Runs one discriminator and one generator update
+       param, real_images: batch of real images, already scaled to -1 to 1
+       param, z: latent batches of the D and G updates, drawn from -1 to 1 when None
+       return: D and G losses
+    '''
+    batch_size = real_images.size(0)
+    z_size = G.fc.in_features
+    device = real_images.device
+    if z is None:
+        z = [torch.rand(batch_size, z_size, device=device) * 2 - 1 for _ in range(2)]
+    d_z, g_z = z
+
+    # 1. Train the discriminator on real and fake images
+    d_optimizer.zero_grad()
+
+    d_real = D(real_images)
+    d_real_loss = real_loss(d_real)
+
+    # Generate fake images
+    fake_images = G(d_z)
+
+    # Compute the discriminator losses on fake images
+    d_fake = D(fake_images)
+    d_fake_loss = fake_loss(d_fake)
+
+    d_loss = d_real_loss + d_fake_loss
+    d_loss.backward()
+    d_optimizer.step()
+
+    # 2. Train the generator with an adversarial loss
+    g_optimizer.zero_grad()
+
+    # Generate fake images
+    fake_images = G(g_z)
+
+    # Compute the discriminator losses on fake images
+    d_fake = D(fake_images)
+
+    g_loss = real_loss(d_fake)
+    g_loss.backward()
+    g_optimizer.step()
+
+    return d_loss, g_loss
+
+
+def train(D, G, data_loader, d_optimizer, g_optimizer, n_epochs, print_every=50,
+          device=None, samples_file='train_samples.pkl'):
+    '''Trains adversarial networks for some number of epochs
+       param, D: the discriminator network
+       param, G: the generator network
+       param, data_loader: loader of real image batches in the 0-1 range
+       param, d_optimizer: optimizer of D
+       param, g_optimizer: optimizer of G
+       param, n_epochs: number of epochs to train for
+       param, print_every: when to print and record the models' losses
+       param, device: where to train, defaults to the GPU when there is one
+       param, samples_file: pickle file receiving the per-epoch samples
+       return: D and G losses
+    '''
+    device = device or default_device()
+    z_size = G.fc.in_features
+    config.apply_threads(config.load_profile('train'))
+
+    # move models to the device
+    D.to(device)
+    G.to(device)
+
+    # keep track of loss and generated, "fake" samples
+    samples = []
+    losses = []
+
+    # Get some fixed data for sampling. These are images that are held
+    # constant throughout training, and allow us to inspect the model's performance
+    sample_size = 16
+    fixed_z = torch.rand(sample_size, z_size, device=device) * 2 - 1
+
+    # epoch training loop
+    for epoch in range(n_epochs):
+
+        # batch training loop
+        for batch_i, (real_images, _) in enumerate(data_loader):
+
+            real_images = scale(real_images).to(device)
+
+            d_loss, g_loss = train_step(D, G, real_images, d_optimizer, g_optimizer)
+
+            # Print some loss stats
+            if batch_i % print_every == 0:
+                # append discriminator loss and generator loss
+                losses.append((d_loss.item(), g_loss.item()))
+                # print discriminator and generator loss
+                print('Epoch [{:5d}/{:5d}] | d_loss: {:6.4f} | g_loss: {:6.4f}'.format(
+                    epoch + 1, n_epochs, d_loss.item(), g_loss.item()))
+                # save models
+                helper.save_model('./discriminator', D)
+                helper.save_model('./generator', G)
+
+        ## AFTER EACH EPOCH##
+        # generate and save sample, fake images
+        G.eval()  # for generating samples
+        with torch.no_grad():
+            samples_z = G(fixed_z)
+        samples.append(samples_z)
+        G.train()  # back to training mode
+
+    # Save training generator samples
+    with open(samples_file, 'wb') as f:
+        pkl.dump(samples, f)
+
+    # finally return losses
+    return losses
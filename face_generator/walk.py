@@ -0,0 +1,168 @@
+"""Latent-space walks rendered as a stream of frame batches.
+
+Keyframe latents (or the seeds that address them) are joined by linear or
+spherical interpolation. The path is built one batch of frames at a time
+with vectorized ops, run through the Generator in fixed-size batches and
+handed to a sink, so a walk of any length only ever holds one batch.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from . import config
+from .generation import encode_png, seed_latents, to_uint8
+from .training import default_device
+
+
+def lerp(z0, z1, t):
+    """Linear interpolation of rows of z0 and z1 at t, all batched on the first dimension"""
+    return z0 + (z1 - z0) * t.unsqueeze(1)
+
+
+def slerp(z0, z1, t, eps=1e-6):
+    """Spherical interpolation of rows of z0 and z1 at t, linear where they are parallel"""
+    cos = (z0 * z1).sum(dim=1) / (z0.norm(dim=1) * z1.norm(dim=1)).clamp_min(eps)
+    omega = torch.acos(cos.clamp(-1, 1))
+    sin = torch.sin(omega)
+    parallel = sin.abs() < eps
+    sin = torch.where(parallel, torch.ones_like(sin), sin)
+
+    w0 = torch.where(parallel, 1 - t, torch.sin((1 - t) * omega) / sin)
+    w1 = torch.where(parallel, t, torch.sin(t * omega) / sin)
+    return z0 * w0.unsqueeze(1) + z1 * w1.unsqueeze(1)
+
+
+INTERPOLATIONS = {'linear': lerp, 'slerp': slerp}
+
+
+def walk_length(n_keyframes, frames_per_segment):
+    """Number of frames in a walk, which ends exactly on its last keyframe"""
+    return (n_keyframes - 1) * frames_per_segment + 1
+
+
+def _check_walk(n_keyframes, frames_per_segment, method):
+    if n_keyframes < 2:
+        raise ValueError('A walk needs at least 2 keyframes, got {}'.format(n_keyframes))
+    if frames_per_segment < 1:
+        raise ValueError('frames_per_segment must be at least 1, got {}'.format(frames_per_segment))
+    if method not in INTERPOLATIONS:
+        raise ValueError('method must be one of {}, got {!r}'.format(sorted(INTERPOLATIONS), method))
+
+
+def walk_latents(keyframes, frames_per_segment, batch_size, method='slerp'):
+    """
+    Build the interpolation path between keyframes, one batch at a time
+    :param keyframes: Tensor of shape (K, z_size), K >= 2
+    :param frames_per_segment: Frames from one keyframe to the next
+    :param batch_size: Number of latents per yielded batch
+    :param method: 'linear' or 'slerp'
+    :return: Iterator over latent batches of shape (<= batch_size, z_size)
+    """
+    _check_walk(keyframes.size(0), frames_per_segment, method)
+    return _walk_batches(keyframes, frames_per_segment, batch_size, INTERPOLATIONS[method])
+
+
+def _walk_batches(keyframes, frames_per_segment, batch_size, interpolate):
+    n_keyframes = keyframes.size(0)
+    n_frames = walk_length(n_keyframes, frames_per_segment)
+
+    for start in range(0, n_frames, batch_size):
+        frames = torch.arange(start, min(start + batch_size, n_frames), device=keyframes.device)
+        # the last frame belongs to the last segment, at t = 1
+        segment = (frames // frames_per_segment).clamp(max=n_keyframes - 2)
+        t = (frames - segment * frames_per_segment).float() / frames_per_segment
+        yield interpolate(keyframes[segment], keyframes[segment + 1], t)
+
+
+def render_walk(G, keyframes, frames_per_segment, batch_size=None, method='slerp', device=None):
+    """
+    Render a latent walk with the generator
+    :param G: The generator network
+    :param keyframes: List of integer seeds, or a tensor of keyframe latents of shape (K, z_size)
+    :param frames_per_segment: Frames from one keyframe to the next
+    :param batch_size: Frames per forward pass, defaults to the tuned 'generate' profile or 512
+    :param method: 'linear' or 'slerp'
+    :param device: Where to run, defaults to the GPU when there is one
+    :return: Iterator over uint8 frame batches of shape (N, H, W, 3)
+    """
+    device = device or default_device()
+    profile = config.load_profile('generate')
+    config.apply_threads(profile)
+    batch_size = batch_size or profile.get('batch_size', 512)
+
+    if not torch.is_tensor(keyframes):
+        keyframes = list(keyframes)
+        _check_walk(len(keyframes), frames_per_segment, method)
+        keyframes = seed_latents(keyframes, G.fc.in_features)
+    latents = walk_latents(keyframes.to(device), frames_per_segment, batch_size, method)
+    return _render(G, latents, device)
+
+
+def _render(G, latents, device):
+    G.to(device)
+    training = G.training
+    G.eval()
+    try:
+        for z in latents:
+            with torch.inference_mode():
+                yield to_uint8(G(z))
+    finally:
+        G.train(training)
+
+
+def write_frames(frame_batches, out_dir, pattern='frame_{:06d}.png', workers=4):
+    """
+    Write every frame to its own PNG, for tools that take an image sequence
+    :param frame_batches: Iterator over uint8 frame batches, as from render_walk
+    :param workers: Threads encoding and writing PNGs; zlib releases the GIL
+    :return: Number of frames written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    def write(item):
+        index, frame = item
+        with open(os.path.join(out_dir, pattern.format(index)), 'wb') as f:
+            f.write(encode_png(frame))
+
+    n_frames = 0
+    pending = []
+    with ThreadPoolExecutor(workers) as pool:
+        # the next batch renders while the previous one is written, and
+        # waiting before queueing it keeps at most two batches in memory
+        for frames in frame_batches:
+            for future in pending:
+                future.result()
+            pending = [pool.submit(write, item) for item in enumerate(frames, n_frames)]
+            n_frames += len(frames)
+        for future in pending:
+            future.result()
+    return n_frames
+
+
+def write_grid(frame_batches, path, n_frames, columns=16):
+    """
+    Paste frames row by row into a single grid image
+    :param frame_batches: Iterator over uint8 frame batches, as from render_walk
+    :param n_frames: Total number of frames, see walk_length
+    :param columns: Frames per grid row
+    :return: Number of frames pasted; nothing is written for an empty stream
+    """
+    from PIL import Image
+
+    grid = None
+    index = 0
+    for frames in frame_batches:
+        if grid is None:
+            height, width = frames.shape[1:3]
+            rows = -(-n_frames // columns)
+            grid = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+        for frame in frames:
+            row, column = divmod(index, columns)
+            grid[row * height:(row + 1) * height, column * width:(column + 1) * width] = frame
+            index += 1
+
+    if grid is not None:
+        Image.fromarray(grid).save(path)
+    return index
@@ -1,12 +1,2 @@
-import os
-import torch
-
-
-def save_model(filename, decoder):
-    save_filename = os.path.splitext(os.path.basename(filename))[0] + '.pt'
-    torch.save(decoder, save_filename)
-
-
-def load_model(filename):
-    save_filename = os.path.splitext(os.path.basename(filename))[0] + '.pt'
-    return torch.load(save_filename)
+# kept for the notebook, the implementation lives in the package
+from face_generator.helper import save_model, load_model  # noqa: F401
@@ -0,0 +1,44 @@
+import pytest
+
+from face_generator import autotune
+
+# images/sec of each (num_threads, num_interop_threads), None for a crash
+THREAD_RATES = {(1, 1): 100, (2, 1): 300, (2, 2): 200, (4, 1): 250, (4, 2): None}
+
+
+def _search(monkeypatch, memory_budget, batch_sizes=(16, 32, 64, 128, 256)):
+    calls = []
+
+    def fake_trial(kind, settings, model_args, device, n_steps):
+        calls.append(settings)
+        rate = THREAD_RATES[settings['num_threads'], settings['num_interop_threads']]
+        if rate is None:
+            return None
+        # bigger batches are always faster, and need more memory
+        return {'images_per_sec': rate + settings['batch_size'],
+                'step_memory': settings['batch_size'] * 1000}
+
+    monkeypatch.setattr(autotune, '_trial', fake_trial)
+    best = autotune.tune_steps('train', batch_sizes, (8, 8, 10), 'cpu', memory_budget,
+                               thread_counts=[1, 2, 4], interop_thread_counts=(1, 2),
+                               log=lambda _: None)
+    return best, calls
+
+
+def test_threads_then_batch_size(monkeypatch):
+    (settings, rate), calls = _search(monkeypatch, memory_budget=64 * 1000)
+
+    assert settings == {'batch_size': 64, 'num_threads': 2, 'num_interop_threads': 1}
+    assert rate == 300 + 64
+
+    # threads on the smallest batch, never more inter-op than intra-op threads
+    assert [(c['num_threads'], c['num_interop_threads']) for c in calls[:5]] == list(THREAD_RATES)
+    assert all(c['batch_size'] == 16 for c in calls[:5])
+    # then growing batches with the best threads, stopping at the first over budget
+    assert [c['batch_size'] for c in calls[5:]] == [32, 64, 128]
+    assert all((c['num_threads'], c['num_interop_threads']) == (2, 1) for c in calls[5:])
+
+
+def test_nothing_fits(monkeypatch):
+    with pytest.raises(RuntimeError):
+        _search(monkeypatch, memory_budget=1000)
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from face_generator import config
+from face_generator.generation import FaceGenerator
+from face_generator.models import build_network
+from face_generator.sampling import RejectionStats, rejection_sample
+
+
+@pytest.fixture
+def profile(tmp_path, monkeypatch):
+    path = tmp_path / 'profile.json'
+    path.write_text(json.dumps({'train': {'batch_size': 7, 'num_workers': 0},
+                                'generate': {'batch_size': 3}}))
+    monkeypatch.setenv(config.PROFILE_ENV, str(path))
+    return path
+
+
+def test_load_profile(profile, tmp_path):
+    assert config.load_profile('train') == {'batch_size': 7, 'num_workers': 0}
+    assert config.load_profile('missing') == {}
+    assert config.load_profile('train', str(tmp_path / 'none.json')) == {}
+
+
+def test_apply_threads():
+    num_threads = torch.get_num_threads()
+    try:
+        config.apply_threads({'num_threads': 2})
+        assert torch.get_num_threads() == 2
+    finally:
+        torch.set_num_threads(num_threads)
+
+
+def test_dataloader_uses_the_profile(profile, tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    pytest.importorskip('torchvision')
+    from face_generator.data import get_dataloader
+
+    (tmp_path / 'data' / 'faces').mkdir(parents=True)
+    Image.new('RGB', (32, 32)).save(str(tmp_path / 'data' / 'faces' / 'a.png'))
+
+    assert get_dataloader(data_dir=str(tmp_path / 'data')).batch_size == 7
+    assert get_dataloader(5, data_dir=str(tmp_path / 'data')).batch_size == 5
+
+
+def test_generation_uses_the_profile(profile, tmp_path, monkeypatch):
+    D, G = build_network(8, 8, 10)
+    assert FaceGenerator(G, device='cpu').batch_size == 3
+
+    stats = RejectionStats()
+    next(iter(rejection_sample(G, D, 1, keep=1, device='cpu', stats=stats)))
+    assert stats.generated == 3
+
+    monkeypatch.setenv(config.PROFILE_ENV, str(tmp_path / 'none.json'))
+    assert FaceGenerator(G, device='cpu').batch_size == 512
@@ -0,0 +1,41 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from face_generator.generation import FaceGenerator, seed_latents
+from face_generator.models import build_network
+
+
+def _faces(cache_size):
+    torch.manual_seed(0)
+    _, G = build_network(8, 8, 10)
+    return FaceGenerator(G, cache_size=cache_size, batch_size=2, device='cpu',
+                         encode=lambda image: image.tobytes())
+
+
+def test_seed_latents_are_deterministic():
+    assert torch.equal(seed_latents([3, 4], 10), seed_latents([3, 4], 10))
+    assert torch.equal(seed_latents([4], 10)[0], seed_latents([3, 4], 10)[1])
+    assert not torch.equal(seed_latents([3], 10), seed_latents([4], 10))
+
+
+def test_lru_cache():
+    faces = _faces(cache_size=2)
+
+    # the three misses are generated over batches of 2, duplicates only once
+    first = faces.get_many([1, 2, 3, 3])
+    assert first[2] == first[3]
+    assert (faces.stats.hits, faces.stats.misses, faces.stats.evictions) == (0, 3, 1)
+    assert len(faces) == 2
+
+    # 1 was evicted as the least recently used, 3 is cached
+    assert faces.get(3) == first[2]
+    assert faces.get(1) == first[0]
+    assert (faces.stats.hits, faces.stats.misses, faces.stats.evictions) == (1, 4, 2)
+
+    # 2 was evicted by 1, since 3 had just been used
+    faces.get(2)
+    assert faces.stats.misses == 5
+
+    # a separately built generator with the same weights gives the same images
+    assert _faces(cache_size=0).get_many([1, 2, 3]) == first[:3]
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from face_generator.helper import load_model, save_model
+
+
+def test_checkpoints_keep_their_directory(tmp_path):
+    run = tmp_path / 'runs' / 'a'
+    run.mkdir(parents=True)
+    save_model(str(run / 'generator_1'), torch.nn.Linear(2, 3))
+
+    assert os.listdir(str(run)) == ['generator_1.pt']
+    assert load_model(str(run / 'generator_1')).out_features == 3
+    assert load_model(str(run / 'generator_1.pt')).out_features == 3
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from face_generator.ingest import ingest
+
+
+def _write(path, color, size=(64, 48), format='JPEG'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', size, color).save(path, format=format)
+
+
+def _ingest(raw_dir, out_dir):
+    return ingest(str(raw_dir), str(out_dir), image_size=32, workers=2, log=lambda _: None)
+
+
+def test_ingest_is_incremental(tmp_path):
+    raw, out = tmp_path / 'raw', tmp_path / 'out'
+    _write(str(raw / 'a.jpg'), 'red')
+    _write(str(raw / 'a.png'), 'blue', format='PNG')
+    _write(str(raw / 'sub' / 'b.jpg'), 'green')
+    (raw / 'bad.jpg').write_bytes(b'not an image')
+
+    # processed, skipped, removed, failed
+    assert _ingest(raw, out) == (3, 0, 0, 1)
+
+    # a flat folder still ends up in a class folder, a.jpg and a.png don't clash
+    assert sorted(os.listdir(str(out))) == ['faces', 'manifest.json']
+    outputs = {'a.jpg.png': (255, 0, 0), 'a.png.png': (0, 0, 255)}
+    for name, color in outputs.items():
+        with Image.open(str(out / 'faces' / name)) as img:
+            assert img.size == (32, 32)
+            pixel = img.getpixel((16, 16))
+            assert all(abs(p - c) <= 8 for p, c in zip(pixel, color))
+    assert (out / 'faces' / 'sub' / 'b.jpg.png').exists()
+    assert 'bad.jpg' not in json.loads((out / 'manifest.json').read_text())['files']
+
+    assert _ingest(raw, out) == (0, 3, 0, 1)
+
+    # new content is processed, a new mtime with the same content is only hashed
+    _write(str(raw / 'a.jpg'), 'white', size=(80, 80))
+    os.utime(str(raw / 'a.jpg'), (1, 1))
+    os.utime(str(raw / 'sub' / 'b.jpg'), (2, 2))
+    (raw / 'a.png').unlink()
+    assert _ingest(raw, out) == (1, 1, 1, 1)
+    assert not (out / 'faces' / 'a.png.png').exists()
+
+
+def test_out_dir_inside_raw_dir_is_skipped(tmp_path):
+    raw = tmp_path / 'raw'
+    _write(str(raw / 'a.jpg'), 'red')
+
+    assert _ingest(raw, raw / 'out') == (1, 0, 0, 0)
+    assert _ingest(raw, raw / 'out') == (0, 1, 0, 0)
+    assert not (raw / 'out' / 'faces' / 'out').exists()
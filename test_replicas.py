@@ -0,0 +1,35 @@
+import copy
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from face_generator.replicas import REPLICA_METHODS, build_replicas
+from face_generator.training import build_optimizers, train_step
+
+
+@pytest.mark.parametrize('method', sorted(REPLICA_METHODS))
+def test_replica_step_matches_separate_steps(method):
+    n_replicas, batch_size, z_size = 3, 4, 10
+    Ds, Gs = build_replicas(8, 8, z_size, seeds=range(n_replicas))
+    separate = [(copy.deepcopy(D), copy.deepcopy(G)) for D, G in zip(Ds, Gs)]
+
+    real_images = torch.rand(batch_size, 3, 32, 32) * 2 - 1
+    d_z = torch.rand(n_replicas, batch_size, z_size) * 2 - 1
+    g_z = torch.rand(n_replicas, batch_size, z_size) * 2 - 1
+
+    replicas = REPLICA_METHODS[method](Ds, Gs)
+    d_loss, g_loss = replicas.step(real_images, (d_z, g_z))
+    replicas.unstack()
+
+    for k, (D, G) in enumerate(separate):
+        d_optimizer, g_optimizer = build_optimizers(D, G)
+        d_loss_k, g_loss_k = train_step(D, G, real_images, d_optimizer, g_optimizer,
+                                        z=(d_z[k], g_z[k]))
+
+        assert torch.allclose(d_loss[k], d_loss_k, atol=1e-5)
+        assert torch.allclose(g_loss[k], g_loss_k, atol=1e-5)
+        for stacked, model in ((Ds[k], D), (Gs[k], G)):
+            for name, value in model.state_dict().items():
+                assert torch.allclose(stacked.state_dict()[name].float(), value.float(),
+                                      atol=1e-5), name
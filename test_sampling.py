@@ -0,0 +1,73 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+nn = torch.nn
+
+from face_generator.sampling import RejectionStats, rejection_sample
+
+
+class StubGenerator(nn.Module):
+    """Fills each image with the first latent value, and remembers the last batch"""
+
+    def __init__(self, z_size=4):
+        super(StubGenerator, self).__init__()
+        self.fc = nn.Linear(z_size, 1)
+
+    def forward(self, z):
+        self.last = z[:, 0].clone()
+        return z[:, 0].view(-1, 1, 1, 1).expand(-1, 3, 32, 32)
+
+
+class StubDiscriminator(nn.Module):
+    """Scores an image with its pixel value"""
+
+    def forward(self, x):
+        return x[:, :1, 0, 0]
+
+
+def _scores(images):
+    return images[:, 0, 0, 0]
+
+
+def test_top_k_keeps_the_best_images_of_each_batch():
+    G, D = StubGenerator(), StubDiscriminator()
+    stats = RejectionStats()
+    batches = rejection_sample(G, D, 5, keep=0.25, batch_size=8, device='cpu', stats=stats)
+
+    sizes = []
+    for images in batches:
+        best = G.last.topk(2).values
+        assert torch.equal(_scores(images).sort(descending=True).values, best[:images.size(0)])
+        sizes.append(images.size(0))
+
+    assert sizes == [2, 2, 1]
+    assert (stats.accepted, stats.generated) == (5, 24)
+
+
+def test_threshold_and_max_batches():
+    G, D = StubGenerator(), StubDiscriminator()
+    images = torch.cat(list(rejection_sample(G, D, 20, threshold=0.5, batch_size=8, device='cpu')))
+    assert images.size(0) == 20
+    assert (_scores(images) > 0.5).all()
+
+    # no pixel value exceeds 2
+    with pytest.raises(RuntimeError):
+        list(rejection_sample(G, D, 1, threshold=2, batch_size=8, device='cpu', max_batches=3))
+
+
+@pytest.mark.parametrize('keep', [0, -0.5, 1.5])
+def test_keep_is_validated(keep):
+    with pytest.raises(ValueError):
+        rejection_sample(StubGenerator(), StubDiscriminator(), 1, keep=keep)
+
+
+def test_modes_are_restored():
+    G, D = StubGenerator(), StubDiscriminator()
+    G.train()
+    D.eval()
+    list(rejection_sample(G, D, 3, batch_size=8, device='cpu'))
+    assert G.training and not D.training
+
+    with pytest.raises(RuntimeError):
+        list(rejection_sample(G, D, 1, threshold=2, batch_size=8, device='cpu', max_batches=1))
+    assert G.training and not D.training
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip('torch')
+Image = pytest.importorskip('PIL.Image')
+
+from face_generator.models import build_network
+from face_generator.walk import render_walk, walk_latents, walk_length, write_frames, write_grid
+
+
+def _path(keyframes, frames_per_segment, batch_size, method):
+    return torch.cat(list(walk_latents(keyframes, frames_per_segment, batch_size, method)))
+
+
+@pytest.mark.parametrize('method', ['linear', 'slerp'])
+def test_path_goes_through_keyframes(method):
+    keyframes = torch.rand(4, 10) * 2 - 1
+    path = _path(keyframes, 5, 3, method)
+
+    assert path.size(0) == walk_length(4, 5)
+    for i in range(4):
+        assert torch.allclose(path[i * 5], keyframes[i], atol=1e-5)
+
+    # batch boundaries don't change the path
+    for batch_size in (1, 7, 100):
+        assert torch.allclose(_path(keyframes, 5, batch_size, method), path, atol=1e-6)
+
+
+def test_invalid_walks_fail_on_the_call():
+    _, G = build_network(8, 8, 10)
+    for keyframes, frames_per_segment in (([], 5), ([1], 5), ([1, 2], 0)):
+        with pytest.raises(ValueError):
+            render_walk(G, keyframes, frames_per_segment, device='cpu')
+
+
+def test_writers(tmp_path):
+    torch.manual_seed(0)
+    _, G = build_network(8, 8, 10)
+    n_frames = walk_length(3, 4)
+
+    frames = render_walk(G, [1, 2, 3], 4, batch_size=4, device='cpu')
+    assert write_frames(frames, str(tmp_path / 'frames')) == n_frames
+    assert len(os.listdir(str(tmp_path / 'frames'))) == n_frames
+
+    frames = render_walk(G, [1, 2, 3], 4, batch_size=4, device='cpu')
+    assert write_grid(frames, str(tmp_path / 'grid.png'), n_frames, columns=4) == n_frames
+    with Image.open(str(tmp_path / 'grid.png')) as grid:
+        # 9 frames over 4 columns take 3 rows
+        assert grid.size == (4 * 32, 3 * 32)
+
+    assert write_grid(iter([]), str(tmp_path / 'empty.png'), 0) == 0
+    assert not (tmp_path / 'empty.png').exists()